@@ -1,110 +1,168 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import joblib
 import os
 import csv
-import time
+import errno
+import hmac
+import logging
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
+from assets import load_assets, build_encoder, predict_cached
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(page_title="Loan System v2.0", layout="wide")
 
-# Custom CSS for UI
-st.markdown("""
-    <style>
-    .main { background-color: #f8f9fa; }
-    .stButton>button { width: 100%; border-radius: 8px; background-color: #1a73e8; color: white; font-weight: bold; }
-    .status-box { padding: 20px; border-radius: 10px; text-align: center; margin-top: 10px; }
-    .approved { background-color: #d4edda; color: #155724; border: 1px solid #c3e6cb; }
-    .rejected { background-color: #f8d7da; color: #721c24; border: 1px solid #f5c6cb; }
-    .success-text { 
-        color: #28a745; 
-        font-weight: bold; 
-        font-size: 22px; 
-        text-align: center; 
-        border: 2px solid #28a745; 
-        padding: 15px; 
-        border-radius: 10px; 
-        margin-top: 20px;
-        background-color: #f0fff4;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-# ---------------- DATA & MODEL LOADING ----------------
+# Custom CSS for UI (file read once; still emitted every run since Streamlit redraws the page)
 @st.cache_resource
-def load_assets():
-    model = joblib.load("best_loan_model.joblib")
-    all_cols = pd.read_csv("cleaned_loan_data.csv").columns.tolist()
-    feature_cols = [col for col in all_cols if not col.startswith("Loan_Status")]
-    return model, feature_cols
+def load_css(path):
+    with open(path) as f:
+        return f"<style>{f.read()}</style>"
+
+st.markdown(load_css("style.css"), unsafe_allow_html=True)
+
+APPROVED_HTML = '<div class="status-box approved"><h2>APPROVED ✅</h2></div>'
+REJECTED_HTML = '<div class="status-box rejected"><h2>REJECTED ❌</h2></div>'
 
+# ---------------- DATA & MODEL LOADING ----------------
 try:
     model, feature_cols = load_assets()
+    encode = build_encoder(tuple(feature_cols))
 except Exception as e:
     st.error(f"❌ Error: {e}")
     st.stop()
 
+# ---------------- FEEDBACK LOG WRITER ----------------
+LOG_FILE = "feedback_results.csv"
+FEEDBACK_COLS = ["Timestamp", "User", "Income", "Loan_Amount", "Prediction", "Model_Accuracy", "Rating", "Accuracy_Opinion", "Suggestions"]
+
+class FeedbackWriter:
+    # Queues feedback rows in memory and appends them to the log in batches from a
+    # background thread, so a submit never waits on file I/O
+    def __init__(self, path, fieldnames, interval=0.5, batch_size=16):
+        self.path = path
+        self.fieldnames = fieldnames
+        self.interval = interval
+        self.batch_size = batch_size
+        self._queue = deque()
+        self._lock = threading.Lock()     # guards the queue
+        self._io_lock = threading.RLock()  # one writer on the file at a time
+        self._wake = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)
+
+    def submit(self, entry):
+        with self._lock:
+            self._queue.append(entry)
+            if len(self._queue) >= self.batch_size:
+                self._wake.set()
+
+    def has_pending(self):
+        with self._lock:
+            return bool(self._queue)
+
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                rows = list(self._queue)
+                self._queue.clear()
+            if not rows:
+                return
+            try:
+                write_header = not os.path.isfile(self.path)
+                with open(self.path, 'a', newline='', encoding='utf-8', buffering=65536) as f:
+                    writer = csv.DictWriter(f, fieldnames=self.fieldnames, quoting=csv.QUOTE_NONNUMERIC, lineterminator=os.linesep)
+                    if write_header:
+                        writer.writeheader()
+                    writer.writerows(rows)
+                    # One fsync per batch, so accepted feedback survives a crash
+                    f.flush()
+                    try:
+                        os.fsync(f.fileno())
+                    except OSError as e:
+                        # Rows are written either way, so re-queueing would duplicate them;
+                        # only a filesystem without fsync support is expected here
+                        if e.errno not in (errno.EINVAL, errno.ENOTSUP):
+                            logging.exception("Could not sync %s; feedback may not be durable", self.path)
+            except Exception:
+                # Keep the rows for the next attempt
+                with self._lock:
+                    self._queue.extendleft(reversed(rows))
+                raise
+
+    @contextmanager
+    def exclusive(self):
+        # Hold the log for an outside writer (admin save); queued rows are written first
+        with self._io_lock:
+            self.flush()
+            yield
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Log and keep the thread alive; the rows are back on the queue
+                logging.exception("Could not write %s; feedback stays queued", self.path)
+
+@st.cache_resource
+def get_feedback_writer():
+    return FeedbackWriter(LOG_FILE, FEEDBACK_COLS)
+
+feedback_writer = get_feedback_writer()
+
+@st.cache_data(ttl=30)
+def load_feedback(path, mtime):
+    # mtime only keys the cache, so the log is re-parsed only after it changes
+    return pd.read_csv(path, engine='c', on_bad_lines='skip').reindex(columns=FEEDBACK_COLS)
+
 # ---------------- HEADER ----------------
 st.title("🏦 Strategic Loan Prediction System")
 st.divider()
 
 # ---------------- INPUT SECTION ----------------
-col1, col2, col3 = st.columns(3)
-with col1:
-    user_name = st.text_input("Full Name *") 
-    gender = st.selectbox("Gender", ["Male", "Female"])
-    married = st.selectbox("Married", ["Yes", "No"])
-    dependents = st.selectbox("Dependents", ["0", "1", "2", "3+"])
-with col2:
-    income = st.number_input("Monthly Income (PKR) *", min_value=0, value=75000)
-    co_income = st.number_input("Co-Applicant Income (PKR)", min_value=0, value=0)
-    credit_history = st.selectbox("Credit Record", ["Good", "Poor"])
-    ch_val = 1.0 if credit_history == "Good" else 0.0
-with col3:
-    loan_pkr = st.number_input("Loan Amount (PKR) *", min_value=10000, value=500000)
-    term = st.slider("Tenure (Years)", 1, 30, 15)
-    property_area = st.selectbox("Area", ["Urban", "Semiurban", "Rural"])
-    education = st.selectbox("Education", ["Graduate", "Not Graduate"])
-    self_emp = st.selectbox("Self Employed", ["Yes", "No"])
+# One form for all inputs, so editing them doesn't rerun the script until submit
+with st.form("loan_form", border=False):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        user_name = st.text_input("Full Name *") 
+        gender = st.selectbox("Gender", ["Male", "Female"])
+        married = st.selectbox("Married", ["Yes", "No"])
+        dependents = st.selectbox("Dependents", ["0", "1", "2", "3+"])
+    with col2:
+        income = st.number_input("Monthly Income (PKR) *", min_value=0, value=75000)
+        co_income = st.number_input("Co-Applicant Income (PKR)", min_value=0, value=0)
+        credit_history = st.selectbox("Credit Record", ["Good", "Poor"])
+        ch_val = 1.0 if credit_history == "Good" else 0.0
+    with col3:
+        loan_pkr = st.number_input("Loan Amount (PKR) *", min_value=10000, value=500000)
+        term = st.slider("Tenure (Years)", 1, 30, 15)
+        property_area = st.selectbox("Area", ["Urban", "Semiurban", "Rural"])
+        education = st.selectbox("Education", ["Graduate", "Not Graduate"])
+        self_emp = st.selectbox("Self Employed", ["Yes", "No"])
+    st.divider()
+    submitted = st.form_submit_button("🔍 ANALYZE ELIGIBILITY", key="analyze")
 
 # ---------------- PREDICTION LOGIC (Dynamic Confidence) ----------------
-st.divider()
-if st.button("🔍 ANALYZE ELIGIBILITY"):
+if submitted:
     if not user_name.strip():
         st.error("⚠️ Please enter your Full Name before proceeding!")
     else:
-        loan_scaled = loan_pkr / 1000
-        total_income = income + co_income
-        
-        input_data = {
-            "ApplicantIncome": income, "CoapplicantIncome": co_income, "LoanAmount": loan_scaled,
-            "Loan_Amount_Term": term * 12, "Credit_History": ch_val, "TotalIncome": total_income,
-            "Income_to_Loan": total_income / (loan_pkr + 1),
-            "log_ApplicantIncome": np.log1p(income), "log_LoanAmount": np.log1p(loan_scaled),
-            "log_TotalIncome": np.log1p(total_income),
-            "Gender_Male": 1 if gender == "Male" else 0, "Married_Yes": 1 if married == "Yes" else 0,
-            "Education_Not Graduate": 1 if education == "Not Graduate" else 0,
-            "Self_Employed_Yes": 1 if self_emp == "Yes" else 0,
-            "Property_Area_Semiurban": 1 if property_area == "Semiurban" else 0,
-            "Property_Area_Urban": 1 if property_area == "Urban" else 0,
-            "Dependents_1": 1 if dependents == "1" else 0, "Dependents_2": 1 if dependents == "2" else 0,
-            "Dependents_3+": 1 if dependents == "3+" else 0
-        }
-
-        input_df = pd.DataFrame([input_data]).reindex(columns=feature_cols, fill_value=0)
+        vec = encode(income, co_income, loan_pkr, term, ch_val, gender, married,
+                     education, self_emp, property_area, dependents)
         
         # Asli Model Prediction & Confidence
-        prediction = model.predict(input_df)[0]
-        probs = model.predict_proba(input_df)[0]
+        prediction, probs = predict_cached(model, tuple(vec.tolist()))
         confidence = probs[1] if prediction == 1 else probs[0]
         dynamic_acc = round(confidence * 100, 2)
         
         res_text = "APPROVED ✅" if prediction == 1 else "REJECTED ❌"
-        color_class = "approved" if prediction == 1 else "rejected"
         
-        st.markdown(f'<div class="status-box {color_class}"><h2>{res_text}</h2></div>', unsafe_allow_html=True)
+        st.markdown(APPROVED_HTML if prediction == 1 else REJECTED_HTML, unsafe_allow_html=True)
         st.write(f"<center>Prediction Confidence: <b>{dynamic_acc}%</b></center>", unsafe_allow_html=True)
         
         # Save results in session to use in feedback form
@@ -137,50 +195,72 @@ if 'res' in st.session_state:
                 "Accuracy_Opinion": opinion,
                 "Suggestions": sugs
             }
-            
-            log_file = "feedback_results.csv"
-            cols_order = ["Timestamp", "User", "Income", "Loan_Amount", "Prediction", "Model_Accuracy", "Rating", "Accuracy_Opinion", "Suggestions"]
-            
-            new_df = pd.DataFrame([feedback_entry])[cols_order]
-            
-            if not os.path.isfile(log_file):
-                new_df.to_csv(log_file, index=False, quoting=csv.QUOTE_NONNUMERIC)
-            else:
-                new_df.to_csv(log_file, mode='a', header=False, index=False, quoting=csv.QUOTE_NONNUMERIC)
+            feedback_writer.submit(feedback_entry)
             
             st.balloons()
-            st.markdown('<p class="success-text">FEEDBACK SUBMITTED & DATA SAVED! ✅</p>', unsafe_allow_html=True)
-            time.sleep(2) 
+            st.toast("Feedback received!", icon="✅")
             st.rerun()
 
 # ---------------- ADMIN SIDEBAR ----------------
 st.sidebar.title("🛠 Admin Access")
-try:
-    real_password = st.secrets["admin_password"]
-except:
-    real_password = "admin123"
 
-pass_input = st.sidebar.text_input("Enter Admin Password", type="password")
+@st.cache_resource
+def get_admin_password():
+    try:
+        return str(st.secrets["admin_password"])
+    except:
+        return "admin123"
+
+# Check the password once per session, then reruns only read the flag
+if not st.session_state.get("is_admin"):
+    pass_input = st.sidebar.text_input("Enter Admin Password", type="password")
+    if pass_input and hmac.compare_digest(pass_input.encode(), get_admin_password().encode()):
+        st.session_state["is_admin"] = True
+        st.rerun()
 
-if pass_input == real_password:
+if st.session_state.get("is_admin"):
     st.sidebar.success("Welcome, Admin!")
-    if os.path.exists("feedback_results.csv"):
+    if st.sidebar.button("🚪 Logout"):
+        st.session_state["is_admin"] = False
+        st.rerun()
+    if os.path.exists(LOG_FILE) or feedback_writer.has_pending():
         try:
-            df_admin = pd.read_csv("feedback_results.csv", engine='python', on_bad_lines='skip')
-            cols_order = ["Timestamp", "User", "Income", "Loan_Amount", "Prediction", "Model_Accuracy", "Rating", "Accuracy_Opinion", "Suggestions"]
-            df_admin = df_admin.reindex(columns=cols_order)
+            # Make sure queued feedback is on disk before reading the log
+            feedback_writer.flush()
+            df_admin = load_feedback(LOG_FILE, os.path.getmtime(LOG_FILE))
             
             st.sidebar.subheader(f"📊 Total Entries: {len(df_admin)}")
-            edited_df = st.sidebar.data_editor(df_admin, num_rows="dynamic", key="admin_editor_final")
+            
+            # Send only one page of the log to the editor instead of the whole history
+            page_size = 100
+            n_pages = max(1, (len(df_admin) + page_size - 1) // page_size)
+            # Fixed key and label keep the selected page when the page count changes
+            if st.session_state.get("admin_page", 1) > n_pages:
+                st.session_state["admin_page"] = n_pages
+            page = st.sidebar.number_input("Page", min_value=1, max_value=n_pages, key="admin_page")
+            st.sidebar.caption(f"of {n_pages}")
+            start, end = (page - 1) * page_size, page * page_size
+            edited_page = st.sidebar.data_editor(df_admin.iloc[start:end], num_rows="dynamic", key=f"admin_editor_final_{page}")
             
             if st.sidebar.button("💾 Save Changes"):
-                edited_df.to_csv("feedback_results.csv", index=False, quoting=csv.QUOTE_NONNUMERIC)
+                original_page = df_admin.iloc[start:end].reset_index(drop=True)
+                kept_rows = edited_page.iloc[:len(original_page)].reset_index(drop=True)
+                with feedback_writer.exclusive():
+                    if end >= len(df_admin) and kept_rows.astype(object).equals(original_page.astype(object)):
+                        # Rows were only added at the end of the log: append them instead of rewriting the file
+                        edited_page.iloc[len(original_page):].to_csv(LOG_FILE, mode='a', header=False, index=False, quoting=csv.QUOTE_NONNUMERIC)
+                    else:
+                        # Keep feedback that reached the log after this page was rendered
+                        latest = load_feedback(LOG_FILE, os.path.getmtime(LOG_FILE))
+                        edited_df = pd.concat([df_admin.iloc[:start], edited_page, df_admin.iloc[end:], latest.iloc[len(df_admin):]], ignore_index=True)
+                        edited_df.to_csv(LOG_FILE, index=False, quoting=csv.QUOTE_NONNUMERIC)
                 st.sidebar.success("Database Updated!")
                 st.rerun()
         except Exception as e:
             st.sidebar.error("⚠️ File Error.")
             if st.sidebar.button("🗑️ Reset File"):
-                os.remove("feedback_results.csv")
+                if os.path.exists(LOG_FILE):
+                    os.remove(LOG_FILE)
                 st.rerun()
     else:
         st.sidebar.info("No records found yet.")
@@ -0,0 +1,81 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import joblib
+from math import log1p
+from scipy.special import expit
+from sklearn.linear_model import LogisticRegression
+
+# Model loading and feature encoding live outside app.py so editing the UI
+# script doesn't invalidate these cached resources on hot reload
+
+class LinearScorer:
+    # Scores a fitted binary logistic regression straight from its coefficients,
+    # skipping sklearn's per-call input validation on single-row predictions
+    def __init__(self, model):
+        self.coef = model.coef_[0]
+        self.intercept = model.intercept_[0]
+
+    def decision_function(self, X):
+        return X @ self.coef + self.intercept
+
+    def predict_proba(self, X):
+        p = expit(self.decision_function(X))
+        return np.column_stack((1.0 - p, p))
+
+@st.cache_resource
+def load_assets():
+    # Memory-map the pickled arrays (read-only) so worker processes share the page cache
+    model = joblib.load("best_loan_model.joblib", mmap_mode='r')
+    # Column order the model was fitted with; otherwise parse only the CSV header
+    if hasattr(model, "feature_names_in_"):
+        feature_cols = list(model.feature_names_in_)
+    else:
+        all_cols = pd.read_csv("cleaned_loan_data.csv", nrows=0).columns.tolist()
+        feature_cols = [col for col in all_cols if not col.startswith("Loan_Status")]
+    if isinstance(model, LogisticRegression) and len(model.classes_) == 2:
+        model = LinearScorer(model)
+    return model, feature_cols
+
+# One-hot columns as in training (get_dummies, first level dropped): prefix -> (form input, levels)
+ONE_HOT = {
+    "Gender": ("gender", ["Male"]), "Married": ("married", ["Yes"]),
+    "Education": ("education", ["Not Graduate"]), "Self_Employed": ("self_emp", ["Yes"]),
+    "Property_Area": ("property_area", ["Semiurban", "Urban"]),
+    "Dependents": ("dependents", ["1", "2", "3+"])
+}
+
+# Source expression for every feature the app can derive from the form inputs
+FEATURE_EXPRS = {
+    "ApplicantIncome": "income", "CoapplicantIncome": "co_income", "LoanAmount": "loan_pkr / 1000",
+    "Loan_Amount_Term": "term * 12", "Credit_History": "ch_val", "TotalIncome": "income + co_income",
+    "Income_to_Loan": "(income + co_income) / (loan_pkr + 1)",
+    "log_ApplicantIncome": "log1p(income)", "log_LoanAmount": "log1p(loan_pkr / 1000)",
+    "log_TotalIncome": "log1p(income + co_income)",
+    **{f"{prefix}_{level}": f"{arg} == {level!r}"
+       for prefix, (arg, levels) in ONE_HOT.items() for level in levels}
+}
+
+@st.cache_resource
+def build_encoder(feature_cols):
+    # Generate a straight-line encoder for this model's column order, so a click
+    # is just index assignments into a preallocated row (unused features are never computed)
+    missing = [col for col in feature_cols if col not in FEATURE_EXPRS]
+    if missing:
+        raise ValueError(f"Model expects features the app cannot encode: {missing}")
+    lines = ["def encode(income, co_income, loan_pkr, term, ch_val, gender, married, education, self_emp, property_area, dependents):",
+             "    buf = template.copy()"]
+    for i, col in enumerate(feature_cols):
+        lines.append(f"    buf[{i}] = {FEATURE_EXPRS[col]}")
+    lines.append("    return buf")
+    namespace = {"log1p": log1p, "template": np.zeros(len(feature_cols), dtype=np.float32)}
+    exec(compile("\n".join(lines), "<encoder>", "exec"), namespace)
+    return namespace["encode"]
+
+@st.cache_data(max_entries=1024)
+def predict_cached(_model, features):
+    # Keyed on the encoded feature tuple, so re-clicking with unchanged inputs skips the model
+    vec = np.asarray(features, dtype=np.float32).reshape(1, -1)
+    probs = _model.predict_proba(vec)[0]
+    # Same threshold as predict(), taken from the one predict_proba pass
+    return int(probs[1] > 0.5), probs